@@ -1,177 +1,428 @@
 #!/usr/bin/env python3
 import os
+import re
+import sys
 import time
 import random
+import collections
+import logging
+import logging.handlers
+import queue
+import threading
+import orjson
 import requests
+import coincurve
+try:
+    import sha3
+    
+    def keccak(data):
+        return sha3.keccak_256(data).digest()
+except ImportError:
+    from eth_hash.auto import keccak
 from web3 import Web3
-from eth_account import Account
-import json
+from websockets.sync.client import connect as ws_connect
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ReadTimeout, ConnectionError
-from stem import Signal
+from stem import Signal, SocketClosed
 from stem.control import Controller
 
+log = logging.getLogger(__name__)
+
+WEI = 10**18
+BLOCK_PROPAGATION_MARGIN = 2.0
+
+class BatchPoller:
+    """Poll balances of many addresses with one JSON-RPC batch request per tick"""
+    max_batch_size = 20
+    
+    def __init__(self, rpc_url):
+        self.rpc_url = rpc_url
+        self.pending = {}
+        self._session = requests.Session()
+        self._session.headers.update({'Content-Type': 'application/json'})
+    
+    def register(self, address, initial_balance_wei, callback):
+        """Call callback(balance_wei) once the balance of address exceeds initial_balance_wei"""
+        self.pending[address] = (initial_balance_wei, callback)
+    
+    def unregister(self, address):
+        self.pending.pop(address, None)
+    
+    def _post_batch(self, batch):
+        response = self._session.post(self.rpc_url, data=orjson.dumps(batch), timeout=30)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    def tick(self, send_batch=None):
+        """Fetch all pending balances, fire callbacks and return {address: balance_wei}
+        
+        send_batch sends the JSON-RPC batch and returns the parsed reply; defaults to an HTTP POST to rpc_url.
+        """
+        send_batch = send_batch or self._post_batch
+        balances = {}
+        addresses = list(self.pending)
+        for start in range(0, len(addresses), self.max_batch_size):
+            chunk = addresses[start:start + self.max_batch_size]
+            batch = [
+                {'jsonrpc': '2.0', 'id': i, 'method': 'eth_getBalance', 'params': [address, 'latest']}
+                for i, address in enumerate(chunk)
+            ]
+            try:
+                results = send_batch(batch)
+                if not isinstance(results, list):
+                    raise ValueError(results.get('error') if isinstance(results, dict) else results)
+                
+                for result in results:
+                    index = result.get('id') if isinstance(result, dict) else None
+                    if not isinstance(index, int) or not 0 <= index < len(chunk):
+                        log.error(f"❌ Unexpected batch response entry: {result}")
+                        continue
+                    if 'result' not in result:
+                        log.error(f"❌ Error getting balance for {chunk[index]}: {result.get('error')}")
+                        continue
+                    balances[chunk[index]] = int(result['result'], 16)
+            except Exception as e:
+                log.error(f"❌ Error polling balances: {e}")
+        
+        for address, balance_wei in balances.items():
+            initial_balance_wei, callback = self.pending[address]
+            if balance_wei > initial_balance_wei:
+                self.unregister(address)
+                callback(balance_wei)
+        return balances
+
+class HeadSubscription:
+    """newHeads WebSocket subscription that also carries JSON-RPC reads over the same connection"""
+    
+    def __init__(self, ws_url, timeout):
+        self.ws_url = ws_url
+        self.deadline = time.time() + timeout
+        self._ws = None
+        self._next_id = 1
+        self._heads = collections.deque()
+    
+    def __enter__(self):
+        self._ws = ws_connect(self.ws_url, open_timeout=10)
+        try:
+            self.call('eth_subscribe', ['newHeads'])
+        except ValueError as e:
+            self._ws.close()
+            raise ConnectionError(f"eth_subscribe rejected: {e}") from e
+        except BaseException:
+            self._ws.close()
+            raise
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._ws.close()
+    
+    def _send(self, payload):
+        # Decoded to str so it goes out as a text frame, which JSON-RPC servers expect
+        self._ws.send(orjson.dumps(payload).decode())
+    
+    def _recv(self, timeout):
+        """Receive one message, queueing head notifications; return None for notifications"""
+        message = orjson.loads(self._ws.recv(timeout=timeout))
+        if isinstance(message, dict) and message.get('method') == 'eth_subscription':
+            self._heads.append(message['params']['result'])
+            return None
+        return message
+    
+    def call(self, method, params):
+        """Send a single JSON-RPC request over the subscription socket and return its result
+        
+        Raises ValueError if the node answers with a JSON-RPC error.
+        """
+        request_id = self._next_id
+        self._next_id += 1
+        self._send({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params})
+        while True:
+            message = self._recv(timeout=10)
+            if isinstance(message, dict) and message.get('id') == request_id:
+                if 'error' in message:
+                    raise ValueError(message['error'])
+                return message['result']
+    
+    def call_batch(self, batch):
+        """Send a JSON-RPC batch over the subscription socket and return the reply array"""
+        self._send(batch)
+        while True:
+            message = self._recv(timeout=10)
+            if isinstance(message, list):
+                return message
+            if isinstance(message, dict) and message.get('id') is None and 'error' in message:
+                return message
+    
+    def __iter__(self):
+        """Yield each new block header until the deadline"""
+        while True:
+            if self._heads:
+                yield self._heads.popleft()
+                continue
+            remaining = self.deadline - time.time()
+            if remaining <= 0:
+                return
+            try:
+                self._recv(timeout=remaining)
+            except TimeoutError:
+                return
+
 class SepoliaFaucetBot:
     def __init__(self):
         self.rpc_url = "https://eth-sepolia.public.blastapi.io"
+        self.ws_url = "wss://ethereum-sepolia-rpc.publicnode.com"
         self.faucet_url = "https://faucet.chainplatform.co/api/ethereum-sepolia/faucet"
         self.request_delay = 1
+        self._attempt_by_error = collections.defaultdict(int)
+        self._gas_price_cache = (0, 0.0)
+        self._faucet_amount_wei = None
+        self._block_time_estimate = 12.0
+        self._last_block = (0, 0)
+        self._pool = collections.deque()
+        self._pool_size = 1024
+        self._pool_low = threading.Event()
+        self._pool_low.set()
+        threading.Thread(target=self._refill_account_pool, daemon=True).start()
         
         self.tor_proxy = {
             'http': 'socks5h://localhost:9050',
             'https': 'socks5h://localhost:9050'
         }
         
+        self._tor_ctl = None
+        
+        self._session = requests.Session()
+        self._session.proxies.update(self.tor_proxy)
+        self._session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': '*/*',
+            'User-Agent': 'Mozilla/5.0 (Linux; Android 13; sdk_gphone_x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Mobile Safari/537.36',
+            'Origin': 'https://faucet.chainplatform.co',
+            'Referer': 'https://faucet.chainplatform.co/faucets/ethereum-sepolia/',
+            'sec-ch-ua': '".Not/A)Brand";v="99", "Google Chrome";v="103", "Chromium";v="103"',
+            'sec-ch-ua-mobile': '?1',
+            'sec-ch-ua-platform': '"Android"',
+            'sec-fetch-site': 'same-origin',
+            'sec-fetch-mode': 'cors',
+            'sec-fetch-dest': 'empty',
+            'accept-encoding': 'gzip, deflate, br',
+            'accept-language': 'en-US,en;q=0.9'
+        })
+        self._session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0))
+        
         self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        self._poller = BatchPoller(self.rpc_url)
         
         if not self.w3.is_connected():
-            print("❌ Failed to connect to Sepolia network")
+            log.error("❌ Failed to connect to Sepolia network")
             exit(1)
         else:
-            print("✅ Connected to Sepolia network")
+            log.info("✅ Connected to Sepolia network")
+    
+    def _backoff(self, err_key, base=1.0, cap=30.0):
+        """Capped exponential backoff with full jitter for a given error type"""
+        delay = random.uniform(0, min(cap, base * 2 ** self._attempt_by_error[err_key]))
+        self._attempt_by_error[err_key] += 1
+        return delay
+    
+    def _derive_account(self):
+        """Derive a random private key and its checksummed and lowercase ETH address with native secp256k1"""
+        private_key = os.urandom(32)
+        public_key = coincurve.PrivateKey(private_key).public_key.format(compressed=False)[1:]
+        address_lower = '0x' + keccak(public_key)[-20:].hex()
+        return private_key.hex(), Web3.to_checksum_address(address_lower), address_lower
+    
+    def _refill_account_pool(self):
+        """Background worker keeping the pre-generated account pool topped up"""
+        while True:
+            self._pool_low.wait()
+            self._pool_low.clear()
+            while len(self._pool) < self._pool_size:
+                self._pool.append(self._derive_account())
     
-    def generate_random_account(self):
-        """Generate a random private key and derive ETH address"""
-        private_key = os.urandom(32).hex()
-        account = Account.from_key(private_key)
+    def generate_random_account(self, recipient_address=None):
+        """Take a pre-generated random private key and ETH address from the pool"""
+        try:
+            private_key, address, address_lower = self._pool.popleft()
+        except IndexError:
+            private_key, address, address_lower = self._derive_account()
+        if len(self._pool) < self._pool_size // 2:
+            self._pool_low.set()
         return {
             'private_key': private_key,
-            'address': account.address
+            'address': address,
+            'address_lower': address_lower,
+            'presigned': self._presign_sweep(private_key, recipient_address)
         }
     
-    def get_balance(self, address):
-        """Get ETH balance for an address"""
+    def _presign_sweep(self, private_key, recipient_address):
+        """Sign the nonce 0 sweep of the expected faucet amount as (raw_tx, gas_price), or return None if unknown"""
+        if recipient_address is None or self._faucet_amount_wei is None:
+            return None
         try:
-            balance_wei = self.w3.eth.get_balance(address)
-            balance_eth = self.w3.from_wei(balance_wei, 'ether')
-            return float(balance_eth)
+            gas_price = self._get_gas_price()
+            send_amount_wei = self._faucet_amount_wei - 21000 * gas_price
+            if send_amount_wei <= 0:
+                return None
+            transaction = {
+                'nonce': 0,
+                'to': recipient_address,
+                'value': send_amount_wei,
+                'gas': 21000,
+                'gasPrice': gas_price,
+                'chainId': 11155111,
+            }
+            return self.w3.eth.account.sign_transaction(transaction, private_key).raw_transaction, gas_price
         except Exception as e:
-            print(f"❌ Error getting balance for {address}: {e}")
+            log.error(f"❌ Error pre-signing sweep transaction: {e}")
+            return None
+    
+    def _get_balance_wei(self, address):
+        """Get the balance of an address in wei"""
+        try:
+            return self.w3.eth.get_balance(address)
+        except Exception as e:
+            log.error(f"❌ Error getting balance for {address}: {e}")
             return 0
     
+    def _observe_latest_block(self):
+        """Fetch the latest block, update the block time EWMA and return whether it is new"""
+        block = self.w3.eth.get_block('latest')
+        last_number, last_timestamp = self._last_block
+        if block['number'] <= last_number:
+            return False
+        if last_number:
+            observed = (block['timestamp'] - last_timestamp) / (block['number'] - last_number)
+            self._block_time_estimate += 0.2 * (observed - self._block_time_estimate)
+        self._last_block = (block['number'], block['timestamp'])
+        return True
+    
+    def _sleep_until_next_block(self, deadline=float('inf')):
+        """Sleep until a block newer than the last observed one is available; return False at the deadline"""
+        while True:
+            _, last_timestamp = self._last_block
+            # Block timestamps mark the slot start; give the node time to import the block
+            wake_at = last_timestamp + self._block_time_estimate + BLOCK_PROPAGATION_MARGIN
+            wait = max(1.0, wake_at - time.time())
+            if time.time() + wait >= deadline:
+                time.sleep(max(0, deadline - time.time()))
+                return False
+            time.sleep(wait)
+            try:
+                if self._observe_latest_block():
+                    return True
+            except Exception as e:
+                log.error(f"❌ Error getting latest block: {e}")
+    
+    def _get_tor_controller(self):
+        """Return the authenticated Tor controller, connecting on first use"""
+        if self._tor_ctl is None or not self._tor_ctl.is_alive():
+            controller = Controller.from_port(port=9051)
+            try:
+                controller.authenticate()
+            except Exception:
+                controller.close()
+                raise
+            self._tor_ctl = controller
+        return self._tor_ctl
+    
+    def _get_gas_price(self, ttl=10):
+        """Return the gas price, refetching it (with a 1.25x margin) at most once per block"""
+        gas_price, fetched_at = self._gas_price_cache
+        if time.time() - fetched_at < ttl:
+            return gas_price
+        gas_price = self.w3.eth.gas_price * 5 // 4
+        self._gas_price_cache = (gas_price, time.time())
+        return gas_price
+    
     def change_tor_identity(self):
         """Request a new Tor identity (unique IP address)"""
         max_attempts = 3
         for attempt in range(max_attempts):
             try:
-                with Controller.from_port(port=9051) as controller:
-                    controller.authenticate()
-                    controller.signal(Signal.NEWNYM)
-                    print(f"🔄 Changed to new Tor identity (unique IP) on attempt {attempt + 1}")
-                    time.sleep(3)
-                    return True
+                controller = self._get_tor_controller()
+                controller.signal(Signal.NEWNYM)
+                self._session.close()
+                log.info(f"🔄 Changed to new Tor identity (unique IP) on attempt {attempt + 1}")
+                time.sleep(3)
+                return True
+            except SocketClosed as e:
+                log.error(f"❌ Tor control connection closed on attempt {attempt + 1}: {e}")
+                self._tor_ctl = None
             except Exception as e:
-                print(f"❌ Error changing Tor identity on attempt {attempt + 1}: {e}")
+                log.error(f"❌ Error changing Tor identity on attempt {attempt + 1}: {e}")
                 if attempt < max_attempts - 1:
-                    print(f"🔄 Retrying Tor identity change in {self.request_delay} seconds...")
+                    log.info(f"🔄 Retrying Tor identity change in {self.request_delay} seconds...")
                     time.sleep(self.request_delay)
-        print("❌ Failed to change Tor identity after maximum attempts - proceeding with current IP")
+        log.error("❌ Failed to change Tor identity after maximum attempts - proceeding with current IP")
         return False
     
     def request_faucet_funds(self, address):
         """Request funds from the faucet API through Tor with a unique IP"""
         try:
-            print(f"🔄 Preparing new IP for faucet request to {address}...")
+            log.info(f"🔄 Preparing new IP for faucet request to {address}...")
             if not self.change_tor_identity():
-                print("⚠️ Proceeding with faucet request despite Tor identity change failure")
+                log.warning("⚠️ Proceeding with faucet request despite Tor identity change failure")
             
-            print(f"🚰 Requesting funds for {address} with new IP...")
+            log.info(f"🚰 Requesting funds for {address} with new IP...")
             
             payload = {
                 'walletAddress': address,
                 'turnstileToken': ''
             }
             
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': '*/*',
-                'User-Agent': 'Mozilla/5.0 (Linux; Android 13; sdk_gphone_x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Mobile Safari/537.36',
-                'Origin': 'https://faucet.chainplatform.co',
-                'Referer': 'https://faucet.chainplatform.co/faucets/ethereum-sepolia/',
-                'sec-ch-ua': '".Not/A)Brand";v="99", "Google Chrome";v="103", "Chromium";v="103"',
-                'sec-ch-ua-mobile': '?1',
-                'sec-ch-ua-platform': '"Android"',
-                'sec-fetch-site': 'same-origin',
-                'sec-fetch-mode': 'cors',
-                'sec-fetch-dest': 'empty',
-                'accept-encoding': 'gzip, deflate, br',
-                'accept-language': 'en-US,en;q=0.9'
-            }
-            
-            response = requests.post(self.faucet_url, json=payload, headers=headers, timeout=30, proxies=self.tor_proxy)
-            print(f"  Response: {response.status_code}")
+            response = self._session.post(self.faucet_url, data=orjson.dumps(payload), timeout=30)
+            log.info(f"  Response: {response.status_code}")
             
             if response.status_code == 200:
-                print("✅ Faucet request successful")
+                log.info("✅ Faucet request successful")
                 return True, response.content
             else:
-                print(f"❌ Faucet request failed: {response.status_code}")
-                print(f"  Raw response: {response.content}")
+                log.error(f"❌ Faucet request failed: {response.status_code}")
+                log.info(f"  Raw response: {response.content}")
                 return False, response.content
                 
         except ReadTimeout:
-            print(f"❌ Error requesting faucet funds: Read timeout after 30 seconds")
+            log.error(f"❌ Error requesting faucet funds: Read timeout after 30 seconds")
             return False, b"TIMEOUT"
         except ConnectionError as e:
             if "Connection reset by peer" in str(e):
-                print(f"❌ Error requesting faucet funds: Connection reset by peer")
+                log.error(f"❌ Error requesting faucet funds: Connection reset by peer")
                 return False, b"CONNECTION_RESET"
             elif "Max retries exceeded with url" in str(e):
-                print(f"❌ Error requesting faucet funds: Max retries exceeded with url")
+                log.error(f"❌ Error requesting faucet funds: Max retries exceeded with url")
                 return False, b"MAX_RETRIES_EXCEEDED"
             else:
-                print(f"❌ Error requesting faucet funds: {e}")
+                log.error(f"❌ Error requesting faucet funds: {e}")
                 return False, b""
         except Exception as e:
-            print(f"❌ Error requesting faucet funds: {e}")
+            log.error(f"❌ Error requesting faucet funds: {e}")
             return False, b""
     
-    def check_balance_and_transfer(self, temp_private_key, temp_address, recipient_address, initial_balance, check_attempts=10):
+    def check_balance_and_transfer(self, temp_private_key, temp_address, recipient_address, initial_balance_wei, check_attempts=10):
         """Check balance for a specified number of attempts and transfer funds if received"""
-        funds_received = False
-        current_balance = 0
-        for i in range(check_attempts):
-            current_balance = self.get_balance(temp_address)
-            if current_balance > initial_balance:
-                funds_received = True
-                print(f"✅ Funds received on check {i+1}! Balance: {current_balance} ETH")
-                break
-            print(f"⏳ Checking balance (Attempt {i+1}/{check_attempts})... Current balance: {current_balance} ETH")
-            time.sleep(1)
-        
-        if funds_received:
-            retry_count = 0
-            while True:
-                retry_count += 1
-                print(f"🔄 Attempting transfer (Attempt #{retry_count})...")
-                if self.transfer_funds(temp_private_key, temp_address, recipient_address, current_balance):
-                    print("✅ Funds successfully transferred to recipient!")
-                    return True
-                else:
-                    print(f"❌ Transfer failed - retrying in {self.request_delay} seconds...")
-                    time.sleep(self.request_delay)
-                    if self.get_balance(temp_address) <= initial_balance:
-                        print("❌ Funds no longer available - stopping retries")
-                        return False
-        return False
+        return self._wait_and_sweep(temp_private_key, temp_address, recipient_address, initial_balance_wei, max_attempts=check_attempts)
     
-    def transfer_funds(self, from_private_key, from_address, to_address, amount_eth):
+    def transfer_funds(self, from_private_key, from_address, to_address, amount_wei, min_gas_price=0):
         """Transfer the full amount (minus gas fees) from one address to another"""
         try:
-            nonce = self.w3.eth.get_transaction_count(from_address)
-            gas_price = self.w3.eth.gas_price
+            with self.w3.batch_requests() as batch:
+                batch.add(self.w3.eth.get_transaction_count(from_address))
+                batch.add(self.w3.eth.get_balance(from_address))
+                nonce, balance_wei = batch.execute()
+            gas_price = max(self._get_gas_price(), min_gas_price)
             gas_limit = 21000
             
             gas_cost_wei = gas_limit * gas_price
             gas_cost_eth = self.w3.from_wei(gas_cost_wei, 'ether')
             
-            balance_wei = self.w3.eth.get_balance(from_address)
             balance_eth = self.w3.from_wei(balance_wei, 'ether')
             
             send_amount_wei = balance_wei - gas_cost_wei
             send_amount_eth = self.w3.from_wei(send_amount_wei, 'ether')
             
             if send_amount_wei <= 0:
-                print(f"❌ Insufficient funds for transfer. Balance: {balance_eth:.18f} ETH, Gas cost: {gas_cost_eth:.18f} ETH")
+                log.error(f"❌ Insufficient funds for transfer. Balance: {balance_eth:.18f} ETH, Gas cost: {gas_cost_eth:.18f} ETH")
                 return False
             
             transaction = {
@@ -180,176 +431,301 @@ class SepoliaFaucetBot:
                 'value': send_amount_wei,
                 'gas': gas_limit,
                 'gasPrice': gas_price,
+                'chainId': 11155111,
             }
             
             signed_txn = self.w3.eth.account.sign_transaction(transaction, from_private_key)
             tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
             
-            print(f"💸 Transfer initiated! TX Hash: {tx_hash.hex()}")
-            print(f"💰 Sent {send_amount_eth:.18f} ETH to {to_address}")
-            
-            print("⏳ Waiting for 1 block confirmation...")
-            tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+            log.info(f"💸 Transfer initiated! TX Hash: {tx_hash.hex()}")
+            log.info(f"💰 Sent {send_amount_eth:.18f} ETH to {to_address}")
             
-            if tx_receipt.status == 1:
-                print(f"✅ Transfer confirmed! Block: {tx_receipt.blockNumber}")
-                return True
-            else:
-                print("❌ Transfer failed!")
-                return False
+            return self._confirm_transfer(tx_hash)
                 
         except Exception as e:
-            print(f"❌ Error transferring funds: {e}")
+            log.error(f"❌ Error transferring funds: {e}")
             return False
     
-    def wait_for_funds_and_transfer(self, temp_private_key, temp_address, recipient_address, initial_balance, timeout=300):
-        """Wait for funds to arrive and immediately transfer them with retries"""
-        print(f"⏳ Waiting for funds to arrive at {temp_address}...")
+    def send_presigned_transfer(self, presigned_raw):
+        """Broadcast a pre-signed sweep transaction and wait for it to confirm"""
+        try:
+            tx_hash = self.w3.eth.send_raw_transaction(presigned_raw)
+            log.info(f"💸 Pre-signed transfer initiated! TX Hash: {tx_hash.hex()}")
+            return self._confirm_transfer(tx_hash)
+        except Exception as e:
+            log.error(f"❌ Error sending pre-signed transfer: {e}")
+            return False
+    
+    def _wait_for_receipt(self, tx_hash, timeout=120):
+        """Look up the transaction receipt once per new block instead of polling it"""
+        deadline = time.time() + timeout
+        params = [Web3.to_hex(tx_hash)]
+        try:
+            with HeadSubscription(self.ws_url, timeout) as subscription:
+                # Check once up front: the tx may already be in a block announced before we subscribed
+                receipt = subscription.call('eth_getTransactionReceipt', params)
+                if receipt is None:
+                    for _ in subscription:
+                        receipt = subscription.call('eth_getTransactionReceipt', params)
+                        if receipt is not None:
+                            break
+        except ValueError:
+            # A JSON-RPC error from the receipt lookup itself, not a subscription failure
+            raise
+        except Exception as e:
+            log.warning(f"⚠️ Block subscription unavailable ({e}) - falling back to polling")
+            remaining = max(0, deadline - time.time())
+            return self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=remaining, poll_latency=1)
         
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            current_balance = self.get_balance(temp_address)
-            
-            if current_balance > initial_balance:
-                print(f"✅ Funds received! Balance: {current_balance} ETH")
-                
-                retry_count = 0
-                while True:
-                    retry_count += 1
-                    print(f"🔄 Attempting transfer (Attempt #{retry_count})...")
-                    if self.transfer_funds(temp_private_key, temp_address, recipient_address, current_balance):
-                        print("✅ Funds successfully transferred to recipient!")
-                        return True
-                    else:
-                        print(f"❌ Transfer failed - retrying in {self.request_delay} seconds...")
-                        time.sleep(self.request_delay)
-                        if self.get_balance(temp_address) <= initial_balance:
-                            print("❌ Funds no longer available - stopping retries")
-                            return False
-            
-            print(f"⏳ Checking... Current balance: {current_balance} ETH")
-            time.sleep(1)
+        if receipt is None:
+            raise TimeoutError(f"Transaction {tx_hash.hex()} not confirmed after {timeout} seconds")
+        return {'status': int(receipt['status'], 16), 'blockNumber': int(receipt['blockNumber'], 16)}
+    
+    def _confirm_transfer(self, tx_hash):
+        """Wait for one block confirmation of a sent transfer"""
+        log.info("⏳ Waiting for 1 block confirmation...")
+        tx_receipt = self._wait_for_receipt(tx_hash)
+        
+        if tx_receipt['status'] == 1:
+            log.info(f"✅ Transfer confirmed! Block: {tx_receipt['blockNumber']}")
+            return True
+        else:
+            log.error("❌ Transfer failed!")
+            return False
+    
+    def _iter_checks(self, *, max_attempts=None, timeout=None):
+        """Yield (attempt, send_batch), one per new block, until max_attempts or timeout is reached
+        
+        While subscribed, send_batch routes balance reads over the WebSocket that delivered the head,
+        so the read sees the block the head announced; when polling it is None (plain HTTP).
+        """
+        deadline = time.time() + timeout if timeout is not None else float('inf')
+        attempt = 0
+        if timeout is not None:
+            try:
+                with HeadSubscription(self.ws_url, timeout) as subscription:
+                    for _ in subscription:
+                        attempt += 1
+                        yield attempt, subscription.call_batch
+                        if attempt == max_attempts:
+                            return
+                return
+            except Exception as e:
+                log.warning(f"⚠️ Block subscription unavailable ({e}) - falling back to polling")
         
-        print(f"❌ Timeout waiting for funds")
+        try:
+            self._observe_latest_block()
+        except Exception as e:
+            log.error(f"❌ Error getting latest block: {e}")
+        while max_attempts is None or attempt < max_attempts:
+            attempt += 1
+            yield attempt, None
+            if (max_attempts is not None and attempt == max_attempts) or not self._sleep_until_next_block(deadline):
+                return
+    
+    def _wait_and_sweep(self, temp_private_key, temp_address, recipient_address, initial_balance_wei, *, max_attempts=None, timeout=None, presigned=None):
+        """Wait until funds arrive or the stop criterion is hit, then transfer them with retries"""
+        received = []
+        self._poller.register(temp_address, initial_balance_wei, received.append)
+        tick = self._poller.tick
+        try:
+            for attempt, send_batch in self._iter_checks(max_attempts=max_attempts, timeout=timeout):
+                current_balance_wei = tick(send_batch).get(temp_address, 0)
+                if received:
+                    break
+                limit = f"/{max_attempts}" if max_attempts is not None else ""
+                log.info(f"⏳ Checking balance (Attempt {attempt}{limit})... Current balance: {current_balance_wei / WEI:.6f} ETH")
+        finally:
+            self._poller.unregister(temp_address)
+        
+        if not received:
+            log.error(f"❌ No funds received while waiting")
+            return False
+        
+        log.info(f"✅ Funds received! Balance: {received[0] / WEI:.6f} ETH")
+        
+        if initial_balance_wei == 0 and self._faucet_amount_wei is None:
+            self._faucet_amount_wei = received[0]
+        
+        min_gas_price = 0
+        if (presigned is not None and initial_balance_wei == 0
+                and received[0] == self._faucet_amount_wei):
+            if presigned[1] < self._get_gas_price():
+                log.info("🔄 Pre-signed gas price is stale - re-signing transfer...")
+                presigned = self._presign_sweep(temp_private_key, recipient_address)
+            if presigned is not None:
+                presigned_raw, presigned_gas_price = presigned
+                log.info("🔄 Sending pre-signed transfer...")
+                if self.send_presigned_transfer(presigned_raw):
+                    log.info("✅ Funds successfully transferred to recipient!")
+                    return True
+                # The pre-signed nonce 0 transaction may still be pending; replacing it needs a 10% gas bump
+                min_gas_price = presigned_gas_price * 11 // 10 + 1
+        
+        retry_count = 0
+        while True:
+            retry_count += 1
+            log.info(f"🔄 Attempting transfer (Attempt #{retry_count})...")
+            if self.transfer_funds(temp_private_key, temp_address, recipient_address, received[0], min_gas_price):
+                log.info("✅ Funds successfully transferred to recipient!")
+                return True
+            else:
+                log.error(f"❌ Transfer failed - retrying in {self.request_delay} seconds...")
+                time.sleep(self.request_delay)
+                if self._get_balance_wei(temp_address) <= initial_balance_wei:
+                    log.error("❌ Funds no longer available - stopping retries")
+                    return False
+    
+    def wait_for_funds_and_transfer(self, temp_private_key, temp_address, recipient_address, initial_balance_wei, timeout=300, presigned=None):
+        """Wait for funds to arrive and immediately transfer them with retries"""
+        log.info(f"⏳ Waiting for funds to arrive at {temp_address}...")
+        return self._wait_and_sweep(temp_private_key, temp_address, recipient_address, initial_balance_wei, timeout=timeout, presigned=presigned)
+    
+    def _reuse_next_cycle(self, tag, label, state):
+        """Keep the temporary address for the next cycle"""
+        log.warning(f"⚠️ {label} detected - reusing address in next cycle")
+        state['reuse'] = True
+        state['cycle'] += 1
+        time.sleep(self._backoff(tag))
         return False
     
+    def _retry_same_address(self, tag, label, state):
+        """Retry the faucet request for the same address after a backoff"""
+        delay = self._backoff(tag)
+        log.warning(f"⚠️ {label} detected - retrying same address in {delay:.2f} seconds...")
+        time.sleep(delay)
+        return True
+    
+    def _check_rate_limited(self, tag, label, state):
+        """Check whether a rate-limited request was funded anyway, then move on"""
+        log.warning(f"⚠️ {label} detected - checking balance for 10 times...")
+        if self.check_balance_and_transfer(state['temp_private_key'], state['temp_address'], state['recipient_address'], state['initial_balance_wei']):
+            # Recheck balance for second time after successful transfer
+            log.info(f"🔄 Rechecking balance for second time after transfer...")
+            state['initial_balance_wei'] = self._get_balance_wei(state['temp_address'])  # Update initial balance
+            if self.check_balance_and_transfer(state['temp_private_key'], state['temp_address'], state['recipient_address'], state['initial_balance_wei']):
+                log.info(f"✅ Second transfer successful!")
+            else:
+                log.error(f"❌ No additional funds received on second check")
+        else:
+            log.error(f"❌ No funds received after 10 checks - moving to next cycle with new address")
+        state['cycle'] += 1
+        time.sleep(self._backoff(tag))
+        return False
+    
+    def _fail_cycle(self, tag, label, state):
+        """Give up on the faucet request and move to the next cycle"""
+        log.error(f"❌ Cycle #{state['cycle']} failed at faucet request")
+        state['cycle'] += 1
+        time.sleep(self._backoff(tag))
+        return False
+    
+    # Faucet error tag -> (handler, log label), in match priority order; handlers return True to retry the same address
+    ERROR_HANDLERS = {
+        b"MAX_RETRIES_EXCEEDED": (_reuse_next_cycle, "Max retries exceeded with url"),
+        b"TRANSACTION_REPLACED": (_reuse_next_cycle, "TRANSACTION_REPLACED"),
+        b"REPLACEMENT_UNDERPRICED": (_reuse_next_cycle, "REPLACEMENT_UNDERPRICED"),
+        b"RATE_LIMIT": (_check_rate_limited, "RATE_LIMIT"),
+        b"Temporarily forbidden due to suspicious requests": (_reuse_next_cycle, "Temporarily forbidden due to suspicious requests"),
+        b"ACCESS_RESTRICTED": (_retry_same_address, "ACCESS_RESTRICTED"),
+        b"TIMEOUT": (_retry_same_address, "Request timeout"),
+        b"CONNECTION_RESET": (_retry_same_address, "Connection reset"),
+    }
+    ERROR_PATTERN = re.compile(b"|".join(map(re.escape, ERROR_HANDLERS)))
+    
     def run_bot(self, recipient_address):
         """Main bot loop"""
-        print(f"🤖 Starting Sepolia Faucet Bot")
-        print(f"📍 Recipient address: {recipient_address}")
-        print(f"{'='*50}")
+        log.info(f"🤖 Starting Sepolia Faucet Bot")
+        log.info(f"📍 Recipient address: {recipient_address}")
+        log.info(f"{'='*50}")
         
-        cycle = 1
-        temp_address = None
-        temp_private_key = None
-        reuse = False
+        state = {
+            'cycle': 1,
+            'recipient_address': recipient_address,
+            'temp_address': None,
+            'temp_address_lower': None,
+            'temp_private_key': None,
+            'temp_presigned': None,
+            'initial_balance_wei': 0,
+            'reuse': False,
+        }
         
         while True:
             try:
-                print(f"\n🔄 Cycle #{cycle}")
+                log.info(f"\n🔄 Cycle #{state['cycle']}")
                 
-                if not reuse:
-                    account = self.generate_random_account()
-                    temp_address = account['address']
-                    temp_private_key = account['private_key']
+                if not state['reuse']:
+                    account = self.generate_random_account(recipient_address)
+                    state['temp_address'] = account['address']
+                    state['temp_address_lower'] = account['address_lower']
+                    state['temp_private_key'] = account['private_key']
+                    state['temp_presigned'] = account['presigned']
                 else:
-                    reuse = False
-                    print(f"🔄 Reusing address from previous cycle: {temp_address}")
+                    state['reuse'] = False
+                    log.info(f"🔄 Reusing address from previous cycle: {state['temp_address']}")
                 
-                print(f"🎲 Generated temporary address: {temp_address}")
-                print(f"🔑 Private key: {temp_private_key[2:] if temp_private_key.startswith('0x') else temp_private_key}")
+                temp_address = state['temp_address']
+                temp_private_key = state['temp_private_key']
+                log.info(f"🎲 Generated temporary address: {temp_address}")
+                log.info(f"🔑 Private key: {temp_private_key[2:] if temp_private_key.startswith('0x') else temp_private_key}")
                 
-                initial_balance = self.get_balance(temp_address)
-                print(f"💰 Initial balance: {initial_balance} ETH")
+                state['initial_balance_wei'] = self._get_balance_wei(temp_address)
+                log.info(f"💰 Initial balance: {state['initial_balance_wei'] / WEI:.6f} ETH")
                 
                 while True:
-                    success, response_content = self.request_faucet_funds(temp_address)
+                    success, response_content = self.request_faucet_funds(state['temp_address_lower'])
                     if success:
-                        if self.wait_for_funds_and_transfer(temp_private_key, temp_address, recipient_address, initial_balance):
-                            print(f"✅ Cycle #{cycle} completed successfully! Moving to next cycle...")
-                            cycle += 1
+                        self._attempt_by_error.clear()
+                        if self.wait_for_funds_and_transfer(temp_private_key, temp_address, recipient_address, state['initial_balance_wei'], presigned=state['temp_presigned']):
+                            log.info(f"✅ Cycle #{state['cycle']} completed successfully! Moving to next cycle...")
+                            state['cycle'] += 1
                             time.sleep(self.request_delay)
                             break
                         else:
-                            print(f"❌ Cycle #{cycle} failed at transfer step - retrying same address...")
+                            log.error(f"❌ Cycle #{state['cycle']} failed at transfer step - retrying same address...")
                             time.sleep(2)
                             continue
                     else:
-                        if b"MAX_RETRIES_EXCEEDED" in response_content:
-                            print(f"⚠️ Max retries exceeded with url detected - reusing address in next cycle")
-                            reuse = True
-                            cycle += 1
-                            time.sleep(self.request_delay)
-                            break
-                        elif b"TRANSACTION_REPLACED" in response_content:
-                            print(f"⚠️ TRANSACTION_REPLACED detected - reusing address in next cycle")
-                            reuse = True
-                            cycle += 1
-                            time.sleep(self.request_delay)
-                            break
-                        elif b"REPLACEMENT_UNDERPRICED" in response_content:
-                            print(f"⚠️ REPLACEMENT_UNDERPRICED detected - reusing address in next cycle")
-                            reuse = True
-                            cycle += 1
-                            time.sleep(self.request_delay)
-                            break
-                        elif b"RATE_LIMIT" in response_content:
-                            print(f"⚠️ RATE_LIMIT detected - checking balance for 10 times...")
-                            if self.check_balance_and_transfer(temp_private_key, temp_address, recipient_address, initial_balance):
-                                # Recheck balance for second time after successful transfer
-                                print(f"🔄 Rechecking balance for second time after transfer...")
-                                initial_balance = self.get_balance(temp_address)  # Update initial balance
-                                if self.check_balance_and_transfer(temp_private_key, temp_address, recipient_address, initial_balance):
-                                    print(f"✅ Second transfer successful!")
-                                else:
-                                    print(f"❌ No additional funds received on second check")
-                            else:
-                                print(f"❌ No funds received after 10 checks - moving to next cycle with new address")
-                            cycle += 1
-                            time.sleep(self.request_delay)
-                            break
-                        elif b"Temporarily forbidden due to suspicious requests" in response_content:
-                            print(f"⚠️ Temporarily forbidden due to suspicious requests detected - reusing address in next cycle")
-                            reuse = True
-                            cycle += 1
-                            time.sleep(self.request_delay)
-                            break
-                        elif b"ACCESS_RESTRICTED" in response_content:
-                            print(f"⚠️ ACCESS_RESTRICTED detected - retrying same address in {self.request_delay} seconds...")
-                            time.sleep(self.request_delay)
+                        found = set(self.ERROR_PATTERN.findall(response_content))
+                        tag = next((tag for tag in self.ERROR_HANDLERS if tag in found), b"")
+                        handler, label = self.ERROR_HANDLERS.get(tag, (SepoliaFaucetBot._fail_cycle, None))
+                        if handler(self, tag, label, state):
                             continue
-                        elif b"TIMEOUT" in response_content:
-                            print(f"⚠️ Request timeout detected - retrying same address in {self.request_delay} seconds...")
-                            time.sleep(self.request_delay)
-                            continue
-                        elif b"CONNECTION_RESET" in response_content:
-                            print(f"⚠️ Connection reset detected - retrying same address in {self.request_delay} seconds...")
-                            time.sleep(self.request_delay)
-                            continue
-                        else:
-                            print(f"❌ Cycle #{cycle} failed at faucet request")
-                            cycle += 1
-                            time.sleep(self.request_delay)
-                            break
+                        break
                 
-                print(f"⚡ Next cycle in {self.request_delay} seconds...")
+                log.info(f"⚡ Next cycle in {self.request_delay} seconds...")
                 
             except KeyboardInterrupt:
-                print(f"\n🛑 Bot stopped by user")
+                log.info(f"\n🛑 Bot stopped by user")
                 break
             except Exception as e:
-                print(f"❌ Unexpected error in cycle #{cycle}: {e}")
-                print(f"⚡ Retrying in {self.request_delay} seconds...")
+                log.error(f"❌ Unexpected error in cycle #{state['cycle']}: {e}")
+                log.info(f"⚡ Retrying in {self.request_delay} seconds...")
                 time.sleep(self.request_delay)
 
+def setup_logging():
+    """Route log records through a queue so console writes happen on a background thread"""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    # Attached to the bot's logger only: stem sets its own logger to TRACE, and its records
+    # would otherwise propagate to a root handler and flood stdout
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    listener.start()
+    return listener
+
 def main():
+    # Printed directly so the banner stays ordered with the input() prompt below
     print("🌊 Sepolia ETH Auto Faucet Bot")
     print()
     
     recipient = input("Enter recipient ETH address: ").strip()
     
     if not Web3.is_address(recipient):
-        print("❌ Invalid Ethereum address!")
+        log.error("❌ Invalid Ethereum address!")
         return
     
     recipient = Web3.to_checksum_address(recipient)
@@ -358,4 +734,8 @@ def main():
     bot.run_bot(recipient)
 
 if __name__ == "__main__":
-    main()
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()